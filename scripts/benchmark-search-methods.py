@@ -6,162 +6,847 @@ Tests against large codebases to demonstrate token usage and performance differe
 
 import os
 import sys
+import mmap
 import time
 import json
+import random
+import re
 import subprocess
 import argparse
-import statistics
+import asyncio
+import functools
+import hashlib
+from contextlib import asynccontextmanager, contextmanager
+from operator import itemgetter
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Tuple
+from typing import AsyncIterator, Awaitable, Dict, List, Optional, Tuple
+import numpy as np
 import tiktoken  # For accurate token counting
 
-# Common search patterns to test
+try:
+    import orjson  # Faster parsing of ripgrep's JSON lines and result saving
+    _json_loads = orjson.loads
+except ImportError:
+    orjson = None
+    _json_loads = json.loads
+
+try:
+    import diskcache  # Persists results between runs (see --no-cache)
+except ImportError:
+    diskcache = None
+
+try:
+    import xxhash  # Cheaper per-match file dedup in the sweep
+    _path_key = xxhash.xxh3_64_intdigest
+except ImportError:
+    xxhash = None
+    _path_key = hash
+
+# Common search patterns to test. "literal" patterns are searched as fixed strings
+# (rg -F) and "file_type" restricts the search to one ripgrep file type (rg --type)
 TEST_QUERIES = [
     # Class searches
-    {"pattern": "class \\w+Controller", "description": "Find controller classes", "type": "class"},
-    {"pattern": "class \\w+Service", "description": "Find service classes", "type": "class"},
-    {"pattern": "class \\w+Repository", "description": "Find repository classes", "type": "class"},
+    {"pattern": "class \\w+Controller", "description": "Find controller classes", "type": "class",
+     "literal": False, "file_type": None},
+    {"pattern": "class \\w+Service", "description": "Find service classes", "type": "class",
+     "literal": False, "file_type": None},
+    {"pattern": "class \\w+Repository", "description": "Find repository classes", "type": "class",
+     "literal": False, "file_type": None},
     
     # Function searches
-    {"pattern": "def authenticate", "description": "Find authentication functions", "type": "function"},
-    {"pattern": "function render", "description": "Find render functions", "type": "function"},
-    {"pattern": "async function fetch", "description": "Find async fetch functions", "type": "function"},
+    {"pattern": "def authenticate", "description": "Find authentication functions", "type": "function",
+     "literal": True, "file_type": "py"},
+    {"pattern": "function render", "description": "Find render functions", "type": "function",
+     "literal": True, "file_type": None},
+    {"pattern": "async function fetch", "description": "Find async fetch functions", "type": "function",
+     "literal": True, "file_type": None},
     
     # Generic searches
-    {"pattern": "TODO|FIXME|HACK", "description": "Find code comments", "type": "comment"},
-    {"pattern": "import.*from", "description": "Find imports", "type": "import"},
-    {"pattern": "useState|useEffect", "description": "Find React hooks", "type": "hook"},
+    {"pattern": "TODO|FIXME|HACK", "description": "Find code comments", "type": "comment",
+     "literal": False, "file_type": None},
+    {"pattern": "import.*from", "description": "Find imports", "type": "import",
+     "literal": False, "file_type": None},
+    {"pattern": "useState|useEffect", "description": "Find React hooks", "type": "hook",
+     "literal": False, "file_type": None},
     
     # Complex patterns
-    {"pattern": "try\\s*{[^}]+catch", "description": "Find try-catch blocks", "type": "error_handling"},
-    {"pattern": "api|endpoint|route", "description": "Find API-related code", "type": "api"},
+    {"pattern": "try\\s*{[^}]+catch", "description": "Find try-catch blocks", "type": "error_handling",
+     "literal": False, "file_type": None},
+    {"pattern": "api|endpoint|route", "description": "Find API-related code", "type": "api",
+     "literal": False, "file_type": None},
 ]
 
 # Token pricing (GPT-4 as example)
 TOKEN_PRICE_PER_1K = 0.03  # $0.03 per 1K input tokens
 
+# Approximate GPT-4 tokens per byte of source code, used to estimate the
+# traditional method's tokens from file sizes (see --exact-tokens, --calibrate)
+TOKENS_PER_BYTE = 0.27
+
+# Bytes of the repo tokenized by --calibrate to measure tokens per byte
+CALIBRATION_SAMPLE_BYTES = 10 * 1024 * 1024
+
+# Per-method measurements, stored column-wise in results["traditional"] / results["optimized"]
+RESULT_COLUMNS = {"tokens": np.int64, "time": np.float64, "cost": np.float64}
+
+# Maximum number of queries in flight at once
+MAX_WORKERS = 16
+
+# Matching lines longer than this are skipped by the optimized search (minified
+# code); filtered in Python, since rg --max-columns has no effect with --json
+MAX_COLUMNS = 200
+
+# Symbols returned per optimized search, like the result limit of a real indexed search
+MAX_SYMBOLS = 50
+
+# On-disk cache of per-query measurements, reused while the repo is unchanged
+CACHE_DIR = ".bench-cache"
+CACHE_TTL = 7 * 24 * 60 * 60  # seconds
+
+# Output written to the current directory by this script and visualize-benchmark-results.py
+RESULTS_FILE_PREFIX = "benchmark_results_"
+VISUALS_DIR = "benchmark_visuals"
+
+# Keeps ripgrep out of that output when benchmarking the directory it is written to
+RG_SKIP_OUTPUT = ["--glob", f"!{RESULTS_FILE_PREFIX}*.json",
+                  "--glob", f"!{VISUALS_DIR}/", "--glob", f"!{CACHE_DIR}/"]
+
+# Longest single line read from ripgrep's stdout (JSON lines for minified files get long)
+RG_LINE_LIMIT = 1 << 26
+
+# Shortest literal worth a separate `rg -l` prescan
+MIN_ANCHOR_LENGTH = 3
+
+# Candidate files handed to a single ripgrep invocation (keeps argv well under OS limits)
+RG_FILES_PER_CALL = 500
+
+# Files tokenized per tiktoken batch during a multi-query sweep
+SWEEP_TOKENIZE_BATCH = 64
+
+_REPETITION = re.compile(r"\{\d*(,\d*)?\}")
+_REGEX_META = re.compile(r"([\\.+*?()|\[\]{}^$])")
+
+# Escapes that stand for exactly one (or zero) characters and take no argument
+_SIMPLE_ESCAPES = set("wWsSdDbBAzntrfv")
+
+# Field accessors for the data of an `rg --json` match event
+_get_match = itemgetter("path", "line_number", "lines")
+_get_path_and_lines = itemgetter("path", "lines")
+
+
+def _result_columns(size: int) -> Dict[str, np.ndarray]:
+    """Preallocate one NumPy array per measurement for size queries"""
+    return {name: np.zeros(size, dtype=dtype) for name, dtype in RESULT_COLUMNS.items()}
+
+
+def _is_benchmark_output(name: str) -> bool:
+    """Whether a file or directory name is one this benchmark writes itself"""
+    return (name in (CACHE_DIR, VISUALS_DIR)
+            or (name.startswith(RESULTS_FILE_PREFIX) and name.endswith(".json")))
+
+
+@functools.lru_cache(maxsize=None)
+def _scan_repo(repo_path: str) -> Tuple[int, int, str]:
+    """Walk the repo once and return (file count, total bytes, content digest).
+    
+    Uses a single os.scandir walk; DirEntry caches the type from the directory
+    listing, so each entry needs only one stat call. Directories that cannot be
+    read are skipped, as Path.rglob does.
+    
+    The digest covers every file's path, size and mtime outside .git, so adding,
+    removing, renaming or editing a file changes it. The benchmark's own output
+    is left out, since a run inside the repo would otherwise invalidate itself.
+    """
+    file_count = 0
+    total_size = 0
+    fingerprints = []
+    stack = [(repo_path, False)]  # (directory, inside .git)
+    while stack:
+        directory, in_git = stack.pop()
+        try:
+            entries = os.scandir(directory)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                if _is_benchmark_output(entry.name):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((entry.path, in_git or entry.name == ".git"))
+                    continue
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                try:
+                    stat = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue  # removed while walking
+                # Only names with an extension count as files, as with rglob("*.*")
+                if "." in entry.name:
+                    file_count += 1
+                total_size += stat.st_size
+                if not in_git:
+                    fingerprints.append(f"{entry.path}\0{stat.st_size}\0{stat.st_mtime_ns}")
+    
+    digest = hashlib.blake2b(digest_size=16)
+    for fingerprint in sorted(fingerprints):
+        digest.update(fingerprint.encode('utf-8', 'surrogateescape') + b"\n")
+    return file_count, total_size, digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def _repo_fingerprint(repo_path: str) -> Optional[Tuple[Optional[str], str]]:
+    """Identify the repo's current state as (git HEAD or None, content digest)"""
+    try:
+        _, _, digest = _scan_repo(repo_path)
+    except OSError:
+        return None
+    
+    try:
+        result = subprocess.run(["git", "-C", repo_path, "rev-parse", "HEAD"],
+                                capture_output=True, text=True, timeout=10)
+        head = result.stdout.strip() if result.returncode == 0 else None
+    except (OSError, subprocess.TimeoutExpired):
+        head = None
+    return head, digest
+
+
+def _formatted_size(path: str) -> int:
+    """Length of a file as _format_file formats it, from its size alone"""
+    return len(path) + 2 + os.stat(path).st_size
+
+
+def _approx_file_tokens(path: str, tokens_per_byte: float = TOKENS_PER_BYTE) -> float:
+    """Estimate tokens for a file as _format_file formats it, from its size alone"""
+    try:
+        return _formatted_size(path) * tokens_per_byte
+    except OSError:
+        return 0.0
+
+
+def _read_file_text(path: str) -> str:
+    """Read a file as UTF-8, decoding straight from a read-only mmap of it"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return ""  # empty files cannot be mapped
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return str(mm, 'utf-8', 'ignore')
+
+
+def _format_file(path: str) -> str:
+    """A file's path and full contents, as the traditional method sends them to the LLM"""
+    try:
+        return f"{path}\n{_read_file_text(path)}\n"
+    except (OSError, ValueError):
+        return ""
+
+
+def _regex_escape(text: str) -> str:
+    """Escape regex metacharacters in a way both ripgrep and Python's re accept"""
+    return _REGEX_META.sub(r"\\\1", text)
+
+
+@functools.lru_cache(maxsize=None)
+def _compile_query_pattern(pattern: str, literal: bool = False) -> re.Pattern:
+    """Compile a query pattern once, as the regex ripgrep will also be given"""
+    return re.compile(_regex_escape(pattern) if literal else pattern)
+
+
+def _extract_literal_anchor(pattern: str) -> Optional[str]:
+    """Return the longest [A-Za-z0-9_]+ run that every match of pattern must contain.
+    
+    Conservative by design: returns None for patterns with alternation or groups,
+    where no single literal is guaranteed to appear, and for escapes or character
+    classes it does not fully understand (e.g. \\x41, \\p{Greek}, [[:alpha:]]).
+    """
+    if any(c in pattern for c in "|()"):
+        return None
+    
+    runs = []
+    current = ""
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c.isascii() and (c.isalnum() or c == "_"):
+            current += c
+            i += 1
+            continue
+        
+        repetition = _REPETITION.match(pattern, i) if c == "{" else None
+        if c in "?*" or repetition:
+            # The quantifier applies to the last character, which may not appear at all
+            current = current[:-1]
+        runs.append(current)
+        current = ""
+        
+        if c == "\\":
+            # Escapes such as \x41 or \p{Greek} take an argument that is not literal text
+            escaped = pattern[i + 1:i + 2]
+            if escaped.isalnum() and escaped not in _SIMPLE_ESCAPES:
+                return None
+            i += 2  # escape sequence such as \w, \s or \.
+        elif c == "[":
+            # Skip the whole character class, including a leading ] or ^]
+            end = i + 1
+            if pattern[end:end + 1] == "^":
+                end += 1
+            if pattern[end:end + 1] == "]":
+                end += 1
+            end = pattern.find("]", end)
+            if end == -1:
+                return None
+            if "\\" in pattern[i:end] or "[" in pattern[i + 1:end]:
+                return None  # escaped ] or nested/POSIX class: the end found may be wrong
+            i = end + 1
+        elif repetition:
+            i = repetition.end()
+        else:
+            i += 1
+    runs.append(current)
+    
+    anchor = max(runs, key=len)
+    return anchor if len(anchor) >= MIN_ANCHOR_LENGTH else None
+
+
+class SearchError(Exception):
+    """A search that failed or timed out, with the time it is reported as taking"""
+    
+    def __init__(self, message: str, elapsed: float):
+        super().__init__(message)
+        self.elapsed = elapsed
+
+
+@contextmanager
+def _as_search_error(timeout: float):
+    """Re-raise a search's timeout or failure as SearchError (timeouts reported as timeout seconds)"""
+    try:
+        yield
+    except SearchError:
+        raise
+    except subprocess.TimeoutExpired:
+        raise SearchError("Timeout", timeout)
+    except Exception as e:
+        raise SearchError(f"Error: {e}", 0.0) from e
+
+
+async def _attempt(search: Awaitable[Tuple]) -> Tuple[object, float, Optional[str]]:
+    """Await a search method, returning (result, time, None) or (None, time, error)"""
+    try:
+        result, elapsed = await search
+        return result, elapsed, None
+    except SearchError as e:
+        return None, e.elapsed, str(e)
+
+
+@asynccontextmanager
+async def _rg_process(cmd: List[str], timeout: float,
+                      input: Optional[str] = None) -> AsyncIterator[asyncio.subprocess.Process]:
+    """Run ripgrep with a streamed stdout, killing it if it runs longer than timeout.
+    
+    input, if given, is written to ripgrep's stdin (e.g. patterns for `-f -`).
+    Raises subprocess.CalledProcessError if ripgrep exits with status 2 (an error
+    such as an invalid pattern) rather than 0 (matches) or 1 (no matches).
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+        stdin=asyncio.subprocess.PIPE if input is not None else None,
+        limit=RG_LINE_LIMIT)
+    if input is not None:
+        # ripgrep reads all of -f before it starts searching, so this cannot block on stdout
+        proc.stdin.write(input.encode('utf-8'))
+        await proc.stdin.drain()
+        proc.stdin.close()
+    timed_out = False
+    
+    def kill():
+        nonlocal timed_out
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            return  # exited just before the timer fired
+        timed_out = True
+    
+    timer = asyncio.get_running_loop().call_later(timeout, kill)
+    try:
+        yield proc
+        await proc.wait()
+    finally:
+        timer.cancel()
+        if proc.returncode is None:
+            try:
+                proc.kill()
+            except ProcessLookupError:
+                pass
+            await proc.wait()
+    
+    if timed_out:
+        raise subprocess.TimeoutExpired(cmd, timeout)
+    if proc.returncode == 2:
+        raise subprocess.CalledProcessError(proc.returncode, cmd[0])
+
+
+async def _rg_accepts_pattern(pattern: str) -> bool:
+    """Whether ripgrep can parse pattern, checked by searching an empty stdin"""
+    try:
+        async with _rg_process(["rg", "-q", "-e", pattern, "-"], timeout=10, input=""):
+            pass
+    except (OSError, subprocess.CalledProcessError, subprocess.TimeoutExpired):
+        return False
+    return True
+
+
+async def _iter_rg_matches(cmd: List[str], timeout: float,
+                           input: Optional[str] = None) -> AsyncIterator[Dict]:
+    """Yield the data of each match event from `rg --json` as it is produced"""
+    async with _rg_process(cmd, timeout, input) as proc:
+        async for raw in proc.stdout:
+            try:
+                data = _json_loads(raw)
+            except json.JSONDecodeError:
+                continue
+            if data.get("type") == "match":
+                yield data["data"]
+
 class SearchBenchmark:
-    def __init__(self, repo_path: str):
+    def __init__(self, repo_path: str, use_query_hints: bool = True, exact_tokens: bool = False,
+                 use_cache: bool = True):
         self.repo_path = Path(repo_path)
+        self.use_query_hints = use_query_hints
+        self.exact_tokens = exact_tokens
+        self.tokens_per_byte = TOKENS_PER_BYTE
+        self.cache = None
+        if use_cache and diskcache is not None:
+            self.cache = diskcache.Cache(CACHE_DIR, eviction_policy="least-recently-used")
         self.tokenizer = tiktoken.encoding_for_model("gpt-4")
         self.results = {
-            "traditional": [],
-            "optimized": [],
+            "traditional": _result_columns(0),
+            "optimized": _result_columns(0),
             "summary": {}
         }
+        # Token counts keyed by hash of the encoded text, so repeated results
+        # (e.g. the same files matched by several patterns) are only encoded once
+        self._tok_cache: Dict[int, int] = {}
         
     def count_tokens(self, text: str) -> int:
         """Count tokens using OpenAI's tiktoken"""
-        return len(self.tokenizer.encode(text))
+        return self.count_tokens_batch([text])[0]
+    
+    def count_tokens_batch(self, texts: List[str]) -> List[int]:
+        """Count tokens for several texts, encoding uncached ones in parallel inside tiktoken"""
+        keys = [hash(text) for text in texts]
+        missing = {key: text for key, text in zip(keys, texts) if key not in self._tok_cache}
+        
+        if missing:
+            encodings = self.tokenizer.encode_batch(list(missing.values()), num_threads=os.cpu_count() or 1)
+            for key, encoding in zip(missing, encodings):
+                self._tok_cache[key] = len(encoding)
+        
+        return [self._tok_cache[key] for key in keys]
     
     def calculate_cost(self, tokens: int) -> float:
         """Calculate API cost based on token count"""
         return (tokens / 1000) * TOKEN_PRICE_PER_1K
     
-    def run_traditional_grep(self, pattern: str, include: str = None) -> Tuple[str, float, int]:
-        """Simulate traditional grep search that sends full file contents"""
-        start_time = time.time()
+    def _cache_key(self, query: Dict, fast: bool) -> Optional[Tuple]:
+        """Cache key for a query's measurements, or None if caching is off"""
+        if self.cache is None:
+            return None
+        repo_path = str(self.repo_path.resolve())
+        fingerprint = _repo_fingerprint(repo_path)
+        if fingerprint is None:
+            return None
         
-        # Build grep command
-        cmd = ["rg", "--json", pattern, str(self.repo_path)]
+        return (
+            query['pattern'], query['type'], query.get('literal'), query.get('file_type'),
+            repo_path, fingerprint, self.use_query_hints, self.exact_tokens,
+            self.tokens_per_byte, fast
+        )
+    
+    def calibrate_tokens_per_byte(self, sample_bytes: int = CALIBRATION_SAMPLE_BYTES) -> float:
+        """Measure tokens per byte with tiktoken and use it for this run's estimates.
+        
+        Tokenizes a random (but repeatable) sample of about sample_bytes of the
+        files ripgrep would search, formatted as the traditional method sends them.
+        Only text files are sampled: an empty pattern matches every non-empty file,
+        but `rg -l` skips binary files just as the traditional search does.
+        """
+        paths = sorted(asyncio.run(self._list_matching_files("", [], timeout=60)))
+        random.Random(0).shuffle(paths)
+        
+        sample = []
+        sampled_bytes = 0
+        for path in paths:
+            if sampled_bytes >= sample_bytes:
+                break
+            try:
+                sampled_bytes += _formatted_size(path)
+            except OSError:
+                continue
+            sample.append(path)
+        
+        if sampled_bytes == 0:
+            print(f"📏 Nothing to calibrate on, keeping {self.tokens_per_byte} tokens/byte")
+            return self.tokens_per_byte
+        
+        tokens = 0
+        for batch_start in range(0, len(sample), SWEEP_TOKENIZE_BATCH):
+            batch = sample[batch_start:batch_start + SWEEP_TOKENIZE_BATCH]
+            tokens += sum(self.count_tokens_batch([_format_file(path) for path in batch]))
+        
+        self.tokens_per_byte = tokens / sampled_bytes
+        print(f"📏 Calibrated on {len(sample):,} files ({sampled_bytes / 1024 / 1024:.1f} MB): "
+              f"{self.tokens_per_byte:.3f} tokens/byte (TOKENS_PER_BYTE is {TOKENS_PER_BYTE})")
+        return self.tokens_per_byte
+    
+    async def _list_matching_files(self, pattern: str, rg_args: List[str], timeout: float,
+                                   include: Optional[str] = None) -> List[str]:
+        """Paths of the repo's files that pattern matches, listed by `rg -l`"""
+        cmd = ["rg", "-l", "-0"] + RG_SKIP_OUTPUT + rg_args + [pattern, str(self.repo_path)]
         if include:
             cmd.extend(["--glob", include])
         
-        try:
-            # Run ripgrep
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-            output_lines = result.stdout.strip().split('\n')
-            
-            # Simulate what gets sent to LLM (full file contents for matches)
-            total_content = []
-            files_seen = set()
+        async with _rg_process(cmd, timeout=timeout) as proc:
+            output = await proc.stdout.read()
+        return [os.fsdecode(path) for path in output.split(b"\0") if path]
+    
+    def _rg_filter_args(self, query: Dict) -> List[str]:
+        """Translate a query's literal/file_type hints into ripgrep flags"""
+        if not self.use_query_hints:
+            return []
+        
+        args = []
+        if query.get("literal"):
+            args.append("-F")
+        if query.get("file_type"):
+            args.extend(["--type", query["file_type"]])
+        return args
+    
+    async def run_traditional_grep(self, query: Dict, include: str = None) -> Tuple[str, float]:
+        """Simulate traditional grep search that sends full file contents"""
+        start_time = time.time()
+        
+        with _as_search_error(30.0):
+            # ripgrep only lists the matching files; their bodies are then read
+            # straight from mmaps rather than line by line
+            paths = await self._list_matching_files(
+                query['pattern'], self._rg_filter_args(query), timeout=30, include=include)
             
-            for line in output_lines:
-                if not line:
-                    continue
-                try:
-                    data = json.loads(line)
-                    if data.get("type") == "match":
-                        file_path = data["data"]["path"]["text"]
-                        
-                        # Simulate reading entire file (what current tools do)
-                        if file_path not in files_seen:
-                            files_seen.add(file_path)
-                            full_path = Path(file_path)
-                            if full_path.exists():
-                                try:
-                                    with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
-                                        content = f.read()
-                                        total_content.append(f"File: {file_path}\n{content}\n")
-                                except:
-                                    pass
-                except json.JSONDecodeError:
-                    continue
+            # What gets sent to LLM: full contents of the matched files only
+            full_text = await asyncio.get_running_loop().run_in_executor(
+                None, lambda: "".join(_format_file(path) for path in paths))
             
-            # Calculate tokens
-            full_text = "\n".join(total_content)
-            tokens = self.count_tokens(full_text)
             elapsed = time.time() - start_time
             
-            return full_text[:1000], elapsed, tokens  # Return sample for verification
+            return full_text, elapsed
+    
+    async def estimate_traditional_grep(self, query: Dict) -> Tuple[int, float]:
+        """Estimate the traditional search's tokens without reading any file contents.
+        
+        `rg -l` lists the matching files and their sizes are converted to tokens with
+        tokens_per_byte, so the cost is one stat per matched file instead of
+        streaming and tokenizing every matched byte. The returned time is likewise
+        only that of listing the files, not of reading them.
+        """
+        start_time = time.time()
+        
+        with _as_search_error(30.0):
+            paths = await self._list_matching_files(
+                query['pattern'], self._rg_filter_args(query), timeout=30)
+            approx = await asyncio.get_running_loop().run_in_executor(
+                None, lambda: sum(_approx_file_tokens(path, self.tokens_per_byte) for path in paths))
+            tokens = round(approx)
+            elapsed = time.time() - start_time
             
-        except subprocess.TimeoutExpired:
-            return "Timeout", 30.0, 0
-        except Exception as e:
-            return f"Error: {e}", 0.0, 0
+            return tokens, elapsed
     
-    def run_optimized_search(self, pattern: str, query_type: str) -> Tuple[str, float, int]:
+    async def run_optimized_search(self, query: Dict) -> Tuple[str, float]:
         """Simulate optimized indexed search"""
         start_time = time.time()
+        query_type = query['type']
+        
+        deadline = start_time + 10
+        filter_args = self._rg_filter_args(query)
         
         # Simulate indexed lookup (in reality would query PostgreSQL)
         # For demo, we'll use ripgrep but only extract relevant portions
-        cmd = ["rg", "--json", "-A", "5", "-B", "5", pattern, str(self.repo_path)]
+        # No file can contribute more than MAX_SYMBOLS of the first MAX_SYMBOLS
+        # matches, so --max-count bounds the work without changing the results
+        # (except that long lines skipped below still count towards a file's cap)
+        cmd = ["rg", "--json", "-A", "5", "-B", "5", "--max-count", str(MAX_SYMBOLS)] + RG_SKIP_OUTPUT
+        cmd.extend(filter_args)
+        cmd.append(query['pattern'])
+        skip_long_lines = self.use_query_hints
         
-        try:
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-            output_lines = result.stdout.strip().split('\n')
+        with _as_search_error(10.0):
+            # Two-pass search: a literal-only `rg -l` prescan finds the files that can
+            # possibly match, and the full regex only runs over those
+            anchor = None if "-F" in filter_args else _extract_literal_anchor(query['pattern'])
+            if anchor:
+                candidates = await self._list_matching_files(
+                    anchor, ["-F"] + filter_args, timeout=max(deadline - time.time(), 0))
+                target_batches = [
+                    ["--"] + candidates[i:i + RG_FILES_PER_CALL]
+                    for i in range(0, len(candidates), RG_FILES_PER_CALL)
+                ]
+            else:
+                target_batches = [[str(self.repo_path)]]
             
-            # Extract only symbol definitions (simulating indexed results)
+            # Extract only symbol definitions (simulating indexed results),
+            # parsing matches while ripgrep is still producing them and stopping
+            # at MAX_SYMBOLS, as an indexed search would
             symbols = []
-            for line in output_lines:
-                if not line:
-                    continue
+            for targets in target_batches:
+                if len(symbols) >= MAX_SYMBOLS:
+                    break
+                matches = _iter_rg_matches(cmd + targets, timeout=max(deadline - time.time(), 0))
                 try:
-                    data = json.loads(line)
-                    if data.get("type") == "match":
-                        match_data = data["data"]
-                        # Extract just the symbol definition with context
-                        symbols.append({
-                            "file": match_data["path"]["text"],
-                            "line": match_data["line_number"],
-                            "text": match_data["lines"]["text"],
-                            "type": query_type
-                        })
-                except:
-                    continue
+                    async for match_data in matches:
+                        try:
+                            # Extract just the symbol definition with context
+                            path, line_number, lines = _get_match(match_data)
+                            text = lines["text"]
+                            if skip_long_lines and len(text.rstrip("\n")) > MAX_COLUMNS:
+                                continue
+                            symbols.append({
+                                "file": path["text"],
+                                "line": line_number,
+                                "text": text,
+                                "type": query_type
+                            })
+                        except (KeyError, TypeError):
+                            continue
+                        if len(symbols) >= MAX_SYMBOLS:
+                            break
+                finally:
+                    await matches.aclose()  # Kills ripgrep if it is still running
             
             # Format as concise symbol list (what optimized search returns)
             formatted_results = []
-            for symbol in symbols[:50]:  # Limit results like a real search would
+            for symbol in symbols:
                 formatted_results.append(
                     f"{symbol['type']} in {symbol['file']}:{symbol['line']}\n{symbol['text'].strip()}"
                 )
             
             result_text = "\n\n".join(formatted_results)
-            tokens = self.count_tokens(result_text)
             elapsed = time.time() - start_time
             
-            return result_text[:1000], elapsed, tokens
+            return result_text, elapsed
+    
+    def _sweep_file_tokens(self, paths: List[str]) -> Dict[str, float]:
+        """Tokens for each file formatted like `rg --heading` output, each file counted once"""
+        if not self.exact_tokens:
+            return {path: _approx_file_tokens(path, self.tokens_per_byte) for path in paths}
+        
+        file_tokens: Dict[str, float] = {}
+        for batch_start in range(0, len(paths), SWEEP_TOKENIZE_BATCH):
+            batch = paths[batch_start:batch_start + SWEEP_TOKENIZE_BATCH]
+            texts = [_format_file(path) for path in batch]
+            file_tokens.update(zip(batch, self.count_tokens_batch(texts)))
+        return file_tokens
+    
+    async def run_multiquery_sweep(self, queries: List[Dict]) -> List[Optional[Tuple[int, float]]]:
+        """Run the traditional search for many queries with one ripgrep pass per file type.
+        
+        All patterns go to a single `rg -f -` invocation (one pattern per stdin
+        line, matched as a single regex set), so the directory
+        walk and ignore-file handling happen once instead of once per query. Each
+        matching line is bucketed back to the queries whose pattern it matches, and
+        every matched file is tokenized once no matter how many queries hit it.
+        Returns (tokens, time) per query, where time is an even share of its
+        group's wall time (amortized, not a per-query measurement). Entries are None where the sweep could not be used,
+        including every query of a file type whose ripgrep call failed.
+        """
+        sweep_results: List[Optional[Tuple[int, float]]] = [None] * len(queries)
+        
+        # Each pattern is matched by ripgrep and then by Python's re (to bucket lines
+        # back to queries), so only patterns both engines accept can join a sweep;
+        # one pattern ripgrep rejects would fail its whole group. The rest run on their own
+        candidates = []
+        for i, query in enumerate(queries):
+            filter_args = self._rg_filter_args(query)
+            literal = "-F" in filter_args
+            if literal:
+                filter_args.remove("-F")
+            try:
+                compiled = _compile_query_pattern(query['pattern'], literal)
+            except re.error:
+                continue
+            candidates.append((i, tuple(filter_args), compiled))
+        accepted = await asyncio.gather(*[
+            _rg_accepts_pattern(compiled.pattern) for _, _, compiled in candidates
+        ])
+        
+        # Group queries by file type, since --type applies to the whole invocation
+        groups: Dict[Tuple[str, ...], List[Tuple[int, re.Pattern]]] = {}
+        for (i, filter_args, compiled), ok in zip(candidates, accepted):
+            if ok:
+                groups.setdefault(filter_args, []).append((i, compiled))
+        
+        for filter_args, members in groups.items():
+            start_time = time.time()
+            cmd = ["rg", "--json"] + RG_SKIP_OUTPUT + list(filter_args) + ["-f", "-", str(self.repo_path)]
+            patterns = "".join(f"{compiled.pattern}\n" for _, compiled in members)
             
-        except subprocess.TimeoutExpired:
-            return "Timeout", 10.0, 0
-        except Exception as e:
-            return f"Error: {e}", 0.0, 0
+            # Matched files are tracked by a 64-bit hash of their path, which is
+            # cheaper to check for every matching line than the string itself
+            files_per_query: Dict[int, set] = {i: set() for i, _ in members}
+            path_by_key: Dict[int, str] = {}
+            try:
+                async for match_data in _iter_rg_matches(cmd, timeout=30 * len(members), input=patterns):
+                    try:
+                        path, line = _get_path_and_lines(match_data)
+                        path, line = path["text"], line["text"]
+                    except (KeyError, TypeError):
+                        continue
+                    # Which patterns matched is decided on the whole line, since
+                    # ripgrep's submatches only report the leftmost combined match
+                    key = _path_key(path)
+                    for i, compiled in members:
+                        if key not in files_per_query[i] and compiled.search(line):
+                            files_per_query[i].add(key)
+                            path_by_key[key] = path
+            except (subprocess.TimeoutExpired, subprocess.CalledProcessError):
+                continue  # these queries fall back to their own searches
+            
+            # File reads and tokenization run off the event loop
+            paths = sorted(path_by_key.values())
+            file_tokens = await asyncio.get_running_loop().run_in_executor(
+                None, self._sweep_file_tokens, paths)
+            
+            elapsed = (time.time() - start_time) / len(members)
+            for i, _ in members:
+                tokens = round(sum(file_tokens[path_by_key[key]] for key in files_per_query[i]))
+                sweep_results[i] = (tokens, elapsed)
+        
+        return sweep_results
+    
+    async def _measure_query(self, query: Dict, semaphore: asyncio.Semaphore,
+                             traditional: Optional[Tuple[int, float]] = None
+                             ) -> Tuple[int, float, int, float, Dict[str, str]]:
+        """Search with both methods and return (trad tokens, trad time, opt tokens, opt time, errors).
+        
+        errors maps "traditional"/"optimized" to the error of a method that failed;
+        a failed method's tokens are reported as 0.
+        """
+        async with semaphore:
+            if traditional is not None:
+                (trad_result, trad_time), trad_error = traditional, None
+                opt_text, opt_time, opt_error = await _attempt(self.run_optimized_search(query))
+            else:
+                # Exact mode returns the matched text, estimation a token count
+                trad_search = (self.run_traditional_grep(query) if self.exact_tokens
+                               else self.estimate_traditional_grep(query))
+                (trad_result, trad_time, trad_error), (opt_text, opt_time, opt_error) = await asyncio.gather(
+                    _attempt(trad_search), _attempt(self.run_optimized_search(query)))
+            
+            # Tokenize the result sets together, off the event loop so other
+            # queries' ripgrep output keeps flowing meanwhile
+            texts = [opt_text or ""]
+            if isinstance(trad_result, str):
+                texts.append(trad_result)
+            counts = await asyncio.get_running_loop().run_in_executor(
+                None, self.count_tokens_batch, texts)
+            opt_tokens = counts[0]
+            trad_tokens = counts[1] if isinstance(trad_result, str) else (trad_result or 0)
+        
+        errors = {
+            method: error
+            for method, error in (("traditional", trad_error), ("optimized", opt_error))
+            if error is not None
+        }
+        return trad_tokens, trad_time, opt_tokens, opt_time, errors
+    
+    async def _run_query(self, query: Dict, semaphore: asyncio.Semaphore,
+                         traditional: Optional[Tuple[int, float]] = None,
+                         cache_key: Optional[Tuple] = None) -> Dict:
+        """Benchmark a single query with both methods.
+        
+        traditional, if given, is a precomputed (tokens, time) for the traditional
+        method (see run_multiquery_sweep). Measurements already cached under
+        cache_key are reused instead of searching again; only measurements where
+        both methods succeeded are cached.
+        """
+        cached = self.cache.get(cache_key) if cache_key is not None else None
+        errors = {}
+        if cached is not None:
+            trad_tokens, trad_time, opt_tokens, opt_time, amortized = cached
+        else:
+            trad_tokens, trad_time, opt_tokens, opt_time, errors = await self._measure_query(
+                query, semaphore, traditional)
+            amortized = traditional is not None
+            # Failed searches are retried next run rather than cached
+            if cache_key is not None and not errors:
+                self.cache.set(cache_key, (trad_tokens, trad_time, opt_tokens, opt_time, amortized),
+                               expire=CACHE_TTL)
+        
+        trad_cost = self.calculate_cost(trad_tokens)
+        opt_cost = self.calculate_cost(opt_tokens)
+        
+        # Calculate improvements
+        token_reduction = ((trad_tokens - opt_tokens) / trad_tokens * 100) if trad_tokens > 0 else 0
+        time_improvement = ((trad_time - opt_time) / trad_time * 100) if trad_time > 0 else 0
+        cost_savings = trad_cost - opt_cost
+        
+        result = {
+            "query": query['description'],
+            "pattern": query['pattern'],
+            "traditional": {
+                "tokens": trad_tokens,
+                "time": trad_time,
+                "cost": trad_cost,
+                "amortized": amortized
+            },
+            "optimized": {
+                "tokens": opt_tokens,
+                "time": opt_time,
+                "cost": opt_cost
+            },
+            "improvements": {
+                "token_reduction": token_reduction,
+                "time_improvement": time_improvement,
+                "cost_savings": cost_savings
+            },
+            "errors": errors
+        }
+        self._print_result(result)
+        return result
     
-    def run_benchmark(self, queries: List[Dict] = None):
-        """Run full benchmark suite"""
+    def _print_result(self, result: Dict):
+        """Pretty-print a single query result"""
+        trad = result["traditional"]
+        opt = result["optimized"]
+        improvements = result["improvements"]
+        errors = result["errors"]
+        
+        print(f"\n📊 Testing: {result['query']}")
+        print(f"   Pattern: {result['pattern']}")
+        
+        print(f"\n   Traditional (grep all files):")
+        if "traditional" in errors:
+            print(f"   - ⚠️  Failed: {errors['traditional']}")
+        print(f"   - Tokens: {trad['tokens']:,}")
+        print(f"   - Time: {trad['time']:.2f}s" + (" (amortized share of the sweep)" if trad["amortized"] else ""))
+        print(f"   - Cost: ${trad['cost']:.4f}")
+        
+        print(f"\n   Optimized (indexed search):")
+        if "optimized" in errors:
+            print(f"   - ⚠️  Failed: {errors['optimized']}")
+        print(f"   - Tokens: {opt['tokens']:,}")
+        print(f"   - Time: {opt['time']:.2f}s")
+        print(f"   - Cost: ${opt['cost']:.4f}")
+        
+        print(f"\n   ✨ Improvements:")
+        print(f"   - Token reduction: {improvements['token_reduction']:.1f}%")
+        print(f"   - Speed improvement: {improvements['time_improvement']:.1f}%"
+              + (" (vs amortized traditional time)" if trad["amortized"] else ""))
+        print(f"   - Cost savings: ${improvements['cost_savings']:.4f} per search")
+    
+    def run_benchmark(self, queries: List[Dict] = None, fast: bool = False):
+        """Run full benchmark suite.
+        
+        With fast=True the traditional method is measured for all queries at once
+        via run_multiquery_sweep.
+        """
         if queries is None:
             queries = TEST_QUERIES
         
@@ -169,73 +854,75 @@ class SearchBenchmark:
         print(f"Repository size: {self.get_repo_stats()}")
         print("-" * 80)
         
-        for query in queries:
-            print(f"\n📊 Testing: {query['description']}")
-            print(f"   Pattern: {query['pattern']}")
-            
-            # Traditional method
-            trad_sample, trad_time, trad_tokens = self.run_traditional_grep(query['pattern'])
-            trad_cost = self.calculate_cost(trad_tokens)
-            
-            # Optimized method
-            opt_sample, opt_time, opt_tokens = self.run_optimized_search(
-                query['pattern'], query['type']
-            )
-            opt_cost = self.calculate_cost(opt_tokens)
-            
-            # Calculate improvements
-            token_reduction = ((trad_tokens - opt_tokens) / trad_tokens * 100) if trad_tokens > 0 else 0
-            time_improvement = ((trad_time - opt_time) / trad_time * 100) if trad_time > 0 else 0
-            cost_savings = trad_cost - opt_cost
-            
-            # Store results
-            result = {
-                "query": query['description'],
-                "pattern": query['pattern'],
-                "traditional": {
-                    "tokens": trad_tokens,
-                    "time": trad_time,
-                    "cost": trad_cost
-                },
-                "optimized": {
-                    "tokens": opt_tokens,
-                    "time": opt_time,
-                    "cost": opt_cost
-                },
-                "improvements": {
-                    "token_reduction": token_reduction,
-                    "time_improvement": time_improvement,
-                    "cost_savings": cost_savings
-                }
-            }
-            
-            self.results["traditional"].append(result["traditional"])
-            self.results["optimized"].append(result["optimized"])
-            
-            # Print results
-            print(f"\n   Traditional (grep all files):")
-            print(f"   - Tokens: {trad_tokens:,}")
-            print(f"   - Time: {trad_time:.2f}s")
-            print(f"   - Cost: ${trad_cost:.4f}")
-            
-            print(f"\n   Optimized (indexed search):")
-            print(f"   - Tokens: {opt_tokens:,}")
-            print(f"   - Time: {opt_time:.2f}s")
-            print(f"   - Cost: ${opt_cost:.4f}")
-            
-            print(f"\n   ✨ Improvements:")
-            print(f"   - Token reduction: {token_reduction:.1f}%")
-            print(f"   - Speed improvement: {time_improvement:.1f}%")
-            print(f"   - Cost savings: ${cost_savings:.4f} per search")
+        if not queries:
+            return
+        
+        if not self.exact_tokens:
+            print(f"≈ Traditional tokens estimated at {self.tokens_per_byte:.3f} tokens/byte, and traditional "
+                  f"time only covers listing the matched files (use --exact-tokens to measure both)")
+        if fast:
+            print("⚡ Fast mode: traditional searches run as one multi-pattern ripgrep sweep")
+        
+        results, sweep_time = asyncio.run(self._run_queries(queries, fast))
+        
+        # Store results column-wise in query order so they line up with TEST_QUERIES
+        for method in ("traditional", "optimized"):
+            columns = _result_columns(len(results))
+            for i, result in enumerate(results):
+                for name in RESULT_COLUMNS:
+                    columns[name][i] = result[method][name]
+            self.results[method] = columns
+        self.results["traditional"]["amortized"] = np.array(
+            [result["traditional"]["amortized"] for result in results], dtype=bool)
+        
+        # How the measurements were taken, so saved results are not read as
+        # like-for-like timings when the traditional method was estimated
+        self.results["summary"].update({
+            "exact_tokens": self.exact_tokens,
+            "tokens_per_byte": None if self.exact_tokens else self.tokens_per_byte,
+            "fast": fast,
+            "sweep_time": sweep_time,
+        })
+    
+    async def _run_queries(self, queries: List[Dict], fast: bool) -> Tuple[List[Dict], Optional[float]]:
+        """Benchmark all queries on one event loop, so ripgrep runs, file I/O and
+        tokenization of different queries overlap.
+        
+        Returns the per-query results and the sweep's total wall time (None if
+        no query was swept).
+        """
+        cache_keys = [self._cache_key(query, fast) for query in queries]
+        misses = [
+            i for i, key in enumerate(cache_keys)
+            if key is None or key not in self.cache
+        ]
+        if len(misses) < len(queries):
+            print(f"♻️  {len(queries) - len(misses)} of {len(queries)} queries reused from {CACHE_DIR}")
+        
+        traditional = [None] * len(queries)
+        sweep_time = None
+        if fast and misses:
+            start_time = time.time()
+            swept = await self.run_multiquery_sweep([queries[i] for i in misses])
+            for i, measured in zip(misses, swept):
+                traditional[i] = measured
+            swept_count = sum(measured is not None for measured in swept)
+            if swept_count:
+                sweep_time = time.time() - start_time
+                print(f"⚡ Swept {swept_count} queries in {sweep_time:.2f}s; their traditional "
+                      f"times below are an even share of that, not per-query measurements")
+        
+        semaphore = asyncio.Semaphore(MAX_WORKERS)
+        results = await asyncio.gather(*[
+            self._run_query(query, semaphore, traditional[i], cache_keys[i])
+            for i, query in enumerate(queries)
+        ])
+        return results, sweep_time
     
     def get_repo_stats(self) -> str:
         """Get repository statistics"""
         try:
-            # Count files
-            file_count = len(list(self.repo_path.rglob("*.*")))
-            
-            # Get directory size
-            total_size = sum(f.stat().st_size for f in self.repo_path.rglob("*") if f.is_file())
+            file_count, total_size, _ = _scan_repo(str(self.repo_path.resolve()))
             size_mb = total_size / 1024 / 1024
             
             return f"{file_count:,} files, {size_mb:.1f} MB"
@@ -244,17 +931,19 @@ class SearchBenchmark:
     
     def generate_summary(self):
         """Generate and print summary statistics"""
-        if not self.results["traditional"]:
+        if self.results["traditional"]["tokens"].size == 0:
             print("\nNo results to summarize")
             return
         
         # Calculate averages
-        avg_trad_tokens = statistics.mean(r["tokens"] for r in self.results["traditional"])
-        avg_opt_tokens = statistics.mean(r["tokens"] for r in self.results["optimized"])
-        avg_trad_time = statistics.mean(r["time"] for r in self.results["traditional"])
-        avg_opt_time = statistics.mean(r["time"] for r in self.results["optimized"])
-        avg_trad_cost = statistics.mean(r["cost"] for r in self.results["traditional"])
-        avg_opt_cost = statistics.mean(r["cost"] for r in self.results["optimized"])
+        trad = self.results["traditional"]
+        opt = self.results["optimized"]
+        avg_trad_tokens = trad["tokens"].mean()
+        avg_opt_tokens = opt["tokens"].mean()
+        avg_trad_time = trad["time"].mean()
+        avg_opt_time = opt["time"].mean()
+        avg_trad_cost = trad["cost"].mean()
+        avg_opt_cost = opt["cost"].mean()
         
         # Calculate overall improvements
         overall_token_reduction = ((avg_trad_tokens - avg_opt_tokens) / avg_trad_tokens * 100)
@@ -271,7 +960,16 @@ class SearchBenchmark:
         
         print(f"\n🚀 Overall improvements:")
         print(f"Token reduction: {overall_token_reduction:.1f}%")
-        print(f"Speed improvement: {overall_time_improvement:.1f}%")
+        time_notes = []
+        if not self.exact_tokens:
+            time_notes.append("traditional time estimated, see --exact-tokens")
+        if trad["amortized"].any():
+            time_notes.append("traditional time amortized over the sweep")
+        print(f"Speed improvement: {overall_time_improvement:.1f}%"
+              + (f" ({'; '.join(time_notes)})" if time_notes else ""))
+        sweep_time = self.results["summary"].get("sweep_time")
+        if sweep_time is not None:
+            print(f"Traditional sweep: {sweep_time:.2f}s total")
         print(f"Cost reduction: {overall_cost_reduction:.1f}%")
         
         print(f"\n💰 Projected savings:")
@@ -291,10 +989,14 @@ class SearchBenchmark:
     def save_results(self):
         """Save detailed results to JSON file"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_file = f"benchmark_results_{timestamp}.json"
+        output_file = f"{RESULTS_FILE_PREFIX}{timestamp}.json"
         
-        with open(output_file, 'w') as f:
-            json.dump(self.results, f, indent=2)
+        if orjson is not None:
+            with open(output_file, 'wb') as f:
+                f.write(orjson.dumps(self.results, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+        else:
+            with open(output_file, 'w') as f:
+                json.dump(self.results, f, indent=2, default=lambda value: value.tolist())
         
         print(f"\n📁 Detailed results saved to: {output_file}")
 
@@ -354,6 +1056,32 @@ def main():
         action="store_true",
         help="Run quick benchmark with fewer queries"
     )
+    parser.add_argument(
+        "--fast",
+        action="store_true",
+        help="Measure the traditional method for all queries in one multi-pattern ripgrep sweep"
+    )
+    parser.add_argument(
+        "--exact-tokens",
+        action="store_true",
+        help="Count traditional tokens with tiktoken instead of estimating them from file sizes"
+    )
+    parser.add_argument(
+        "--calibrate",
+        action="store_true",
+        help=f"Measure tokens per byte with tiktoken on a {CALIBRATION_SAMPLE_BYTES // 1024 // 1024} MB sample "
+             f"of the repo and use it to estimate traditional tokens"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"Always re-run searches instead of reusing results cached in {CACHE_DIR} (needs diskcache)"
+    )
+    parser.add_argument(
+        "--no-query-hints",
+        action="store_true",
+        help=f"Search every pattern as a plain regex (ignore literal/file_type hints and keep lines over {MAX_COLUMNS} columns)"
+    )
     
     args = parser.parse_args()
     
@@ -389,7 +1117,10 @@ def main():
         return
     
     # Run benchmark
-    benchmark = SearchBenchmark(repo_path)
+    benchmark = SearchBenchmark(repo_path, use_query_hints=not args.no_query_hints,
+                                exact_tokens=args.exact_tokens, use_cache=not args.no_cache)
+    if args.calibrate and not args.exact_tokens:
+        benchmark.calibrate_tokens_per_byte()
     
     if args.quick:
         # Use subset of queries for quick test
@@ -397,7 +1128,7 @@ def main():
     else:
         queries = TEST_QUERIES
     
-    benchmark.run_benchmark(queries)
+    benchmark.run_benchmark(queries, fast=args.fast)
     benchmark.generate_summary()
 
 
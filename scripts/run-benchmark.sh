@@ -39,6 +39,12 @@ check_requirements() {
         pip3 install tiktoken
     fi
     
+    # Check for numpy
+    if ! python3 -c "import numpy" &> /dev/null; then
+        echo "📦 Installing numpy for result summaries..."
+        pip3 install numpy
+    fi
+    
     echo "✅ All requirements satisfied!"
     echo ""
 }
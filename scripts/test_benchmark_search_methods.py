@@ -0,0 +1,152 @@
+"""
+Tests for benchmark-search-methods.py
+
+Run with: python -m pytest scripts/test_benchmark_search_methods.py
+Tests that run searches need ripgrep on PATH; token counts use a stub encoding,
+so no tiktoken download is needed.
+"""
+
+import asyncio
+import importlib.util
+import shutil
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("tiktoken")
+
+# The script's file name is not importable with a plain import statement
+_spec = importlib.util.spec_from_file_location(
+    "benchmark_search_methods", Path(__file__).with_name("benchmark-search-methods.py"))
+bench = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(bench)
+
+requires_rg = pytest.mark.skipif(shutil.which("rg") is None, reason="ripgrep is not installed")
+
+
+@pytest.mark.parametrize("pattern, anchor", [
+    (r"class \w+Controller", "Controller"),
+    ("def authenticate", "authenticate"),
+    ("colou?r", "colo"),  # the optional u may be missing
+    ("abcd*", "abc"),
+    ("foo{0,2}bar", "bar"),
+    ("a{0,2}b", None),  # nothing long enough is guaranteed
+    ("[]x]abc", "abc"),  # ] first in a class is a literal, not its end
+    ("[^]x]abc", "abc"),
+    (r"\bauthenticate\b", "authenticate"),
+    (r"price\$total", "price"),
+    (r"try\s*{[^}]+catch", "catch"),
+    ("import.*from", "import"),
+    ("TODO|FIXME|HACK", None),
+    ("(foo)bar", None),
+    ("[abc", None),  # unterminated class
+    (r"\x41BCDE", None),  # escapes with arguments
+    (r"\u0041bcdef", None),
+    (r"\pNfoo", None),
+    (r"\p{Greek}abc", None),
+    (r"\P{Lu}abc", None),
+    (r"\1abcd", None),
+    (r"[\]abcd]efg", None),  # escaped ] inside a class
+    ("[[:alpha:]abcd]efg", None),
+    (r"\.render", "render"),
+    (r"\d+items", "items"),
+])
+def test_extract_literal_anchor(pattern, anchor):
+    assert bench._extract_literal_anchor(pattern) == anchor
+
+
+class StubEncoding:
+    """Stands in for tiktoken's cl100k_base: one token per whitespace-separated word"""
+    
+    def encode(self, text):
+        return text.split()
+    
+    def encode_batch(self, texts, num_threads=1):
+        return [self.encode(text) for text in texts]
+
+
+@pytest.fixture
+def benchmark(tmp_path, monkeypatch):
+    """An exact-token benchmark over a two-file repo"""
+    (tmp_path / "auth.py").write_text("def authenticate(user):\n    return True\n")
+    (tmp_path / "other.py").write_text("print('hello')\n")
+    monkeypatch.setattr(bench.tiktoken, "encoding_for_model", lambda model: StubEncoding())
+    return bench.SearchBenchmark(str(tmp_path), exact_tokens=True, use_cache=False)
+
+
+@requires_rg
+def test_traditional_zero_match_query_has_no_tokens(benchmark):
+    query = {"pattern": "zzzzqqq_nomatch", "literal": False, "file_type": None}
+    text, _ = asyncio.run(benchmark.run_traditional_grep(query))
+    assert text == ""
+    assert benchmark.count_tokens(text) == 0
+
+
+@requires_rg
+def test_traditional_sends_only_matched_files(benchmark):
+    query = {"pattern": "def authenticate", "literal": True, "file_type": None}
+    text, _ = asyncio.run(benchmark.run_traditional_grep(query))
+    assert "return True" in text
+    assert "hello" not in text
+
+
+@requires_rg
+def test_optimized_skips_long_lines(benchmark):
+    minified = "x" * bench.MAX_COLUMNS + " def authenticate_minified(): pass\n"
+    (benchmark.repo_path / "bundle.py").write_text(minified)
+    query = {"pattern": "def authenticate", "type": "function", "literal": True, "file_type": None}
+    
+    text, _ = asyncio.run(benchmark.run_optimized_search(query))
+    assert "auth.py:1" in text
+    assert "authenticate_minified" not in text
+    
+    benchmark.use_query_hints = False
+    text, _ = asyncio.run(benchmark.run_optimized_search(query))
+    assert "authenticate_minified" in text
+
+
+@requires_rg
+def test_sweep_leaves_out_patterns_python_cannot_compile(benchmark):
+    # \p{Lu} is valid for ripgrep but a bad escape for Python's re
+    queries = [
+        {"pattern": r"\p{Lu}\w+Controller", "literal": False, "file_type": None},
+        {"pattern": "def authenticate", "literal": True, "file_type": None},
+    ]
+    swept = asyncio.run(benchmark.run_multiquery_sweep(queries))
+    assert swept[0] is None
+    assert swept[1] is not None
+
+
+@requires_rg
+def test_sweep_tokens_match_per_query_search(benchmark):
+    (benchmark.repo_path / "views.py").write_text(
+        "import auth\n\nclass LoginController:\n    def get(self):\n        return auth.authenticate(self)\n")
+    (benchmark.repo_path / "app.js").write_text("import { authenticate } from './auth'\nclass AppController {}\n")
+    queries = [
+        {"pattern": "def authenticate", "literal": True, "file_type": None},
+        {"pattern": "authenticate", "literal": True, "file_type": None},  # same lines as above
+        {"pattern": r"class \w+Controller", "literal": False, "file_type": None},
+        {"pattern": "import", "literal": True, "file_type": "py"},  # runs in its own group
+        {"pattern": r"\breturn\b", "literal": False, "file_type": "py"},
+        {"pattern": "zzzzqqq_nomatch", "literal": False, "file_type": None},
+        {"pattern": r"try\s*{[^}]+catch", "literal": False, "file_type": None},  # ripgrep rejects it
+    ]
+    swept = asyncio.run(benchmark.run_multiquery_sweep(queries))
+    
+    assert swept[-1] is None
+    for query, measured in zip(queries[:-1], swept):
+        text, _ = asyncio.run(benchmark.run_traditional_grep(query))
+        assert measured[0] == benchmark.count_tokens(text), query["pattern"]
+
+
+def test_repo_digest_ignores_benchmark_output(tmp_path):
+    (tmp_path / "app.py").write_text("print('hello')\n")
+    digest = bench._scan_repo.__wrapped__(str(tmp_path))[2]
+    
+    (tmp_path / f"{bench.RESULTS_FILE_PREFIX}20240101_000000.json").write_text("{}")
+    (tmp_path / bench.VISUALS_DIR).mkdir()
+    assert bench._scan_repo.__wrapped__(str(tmp_path))[2] == digest
+    
+    (tmp_path / "app.py").rename(tmp_path / "main.py")
+    assert bench._scan_repo.__wrapped__(str(tmp_path))[2] != digest
@@ -7,114 +7,137 @@ Perfect for blog posts, presentations, and social media
 import json
 import sys
 from pathlib import Path
+import matplotlib
+matplotlib.use('Agg')  # Render straight to PNG, no GUI backend probing
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
+import numpy as np
 from datetime import datetime
 
 def load_results(results_file):
-    """Load benchmark results from JSON file"""
+    """Load benchmark results from JSON file, with each method's measurements as NumPy arrays"""
     with open(results_file, 'r') as f:
-        return json.load(f)
-
-def create_token_comparison_chart(results, output_dir):
-    """Create bar chart comparing token usage"""
-    queries = []
-    trad_tokens = []
-    opt_tokens = []
+        results = json.load(f)
     
+    for method in ('traditional', 'optimized'):
+        results[method] = as_columns(results[method])
+    return results
+
+def as_columns(measurements):
+    """Convert {"tokens": [...], ...} columns to NumPy arrays.
+    
+    Results saved by older versions of the benchmark (a list of
+    {"tokens", "time", "cost"} dicts) are converted as well.
+    """
+    if isinstance(measurements, list):
+        measurements = {name: [m[name] for m in measurements] for name in ('tokens', 'time', 'cost')}
+    return {
+        'tokens': np.asarray(measurements['tokens'], dtype=np.int64),
+        'time': np.asarray(measurements['time'], dtype=np.float64),
+        'cost': np.asarray(measurements['cost'], dtype=np.float64),
+    }
+
+def format_dollars(value):
+    """Format a dollar amount compactly for bar labels"""
+    if value > 1000000:
+        return f'${value/1000000:.1f}M'
+    if value > 1000:
+        return f'${value/1000:.1f}K'
+    return f'${value:.0f}'
+
+def traditional_time_note(results):
+    """Caveat for the traditional times, or None when they are full searches.
+    
+    Without --exact-tokens the benchmark only times listing the matched files,
+    and with --fast swept queries get an even share of the sweep's wall time.
+    Results saved before the summary recorded this were always measured in full.
+    """
+    summary = results.get('summary', {})
+    notes = []
+    if not summary.get('exact_tokens', True):
+        notes.append('traditional time estimated: file listing only')
+    if summary.get('fast'):
+        notes.append('traditional time amortized over one sweep')
+    return '; '.join(notes) or None
+
+def search_time_tag(results):
+    """Short form of traditional_time_note for the infographic's time panel"""
+    summary = results.get('summary', {})
+    if not summary.get('exact_tokens', True):
+        return ' (estimated)'
+    if summary.get('fast'):
+        return ' (amortized)'
+    return ''
+
+def draw_token_comparison(ax, results):
+    """Draw bar chart comparing token usage"""
     # Extract data
-    for i, (trad, opt) in enumerate(zip(results['traditional'], results['optimized'])):
-        queries.append(f"Query {i+1}")
-        trad_tokens.append(trad['tokens'])
-        opt_tokens.append(opt['tokens'])
+    trad_tokens = results['traditional']['tokens']
+    opt_tokens = results['optimized']['tokens']
+    queries = [f"Query {i+1}" for i in range(len(trad_tokens))]
     
-    # Create figure
-    fig, ax = plt.subplots(figsize=(12, 8))
-    
-    x = range(len(queries))
+    x = np.arange(len(queries))
     width = 0.35
     
     # Create bars
-    bars1 = ax.bar([i - width/2 for i in x], trad_tokens, width, 
+    bars1 = ax.bar(x - width/2, trad_tokens, width, 
                     label='Traditional (Grep)', color='#ff6b6b', alpha=0.8)
-    bars2 = ax.bar([i + width/2 for i in x], opt_tokens, width,
+    bars2 = ax.bar(x + width/2, opt_tokens, width,
                     label='Optimized (Indexed)', color='#4ecdc4', alpha=0.8)
     
     # Add value labels on bars
-    for bars in [bars1, bars2]:
-        for bar in bars:
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height,
-                    f'{int(height):,}',
-                    ha='center', va='bottom', fontsize=10)
+    ax.bar_label(bars1, fmt='{:,.0f}', fontsize=10)
+    ax.bar_label(bars2, fmt='{:,.0f}', fontsize=10)
     
     # Customize chart
     ax.set_xlabel('Search Queries', fontsize=14)
     ax.set_ylabel('Tokens Used', fontsize=14)
-    ax.set_title('Token Usage Comparison: Traditional vs Optimized Search', fontsize=16, pad=20)
+    ax.set_title('Token Usage Comparison: Traditional vs Optimized Search', fontsize=14, pad=20)
     ax.set_xticks(x)
     ax.set_xticklabels(queries, rotation=45, ha='right')
     ax.legend(fontsize=12)
     ax.grid(axis='y', alpha=0.3)
     
     # Add average reduction text
-    avg_trad = sum(trad_tokens) / len(trad_tokens)
-    avg_opt = sum(opt_tokens) / len(opt_tokens)
+    avg_trad = trad_tokens.mean()
+    avg_opt = opt_tokens.mean()
     reduction = ((avg_trad - avg_opt) / avg_trad) * 100
     
     ax.text(0.5, 0.95, f'Average Token Reduction: {reduction:.1f}%', 
             transform=ax.transAxes, fontsize=14, fontweight='bold',
             ha='center', bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
-    
-    plt.tight_layout()
-    output_path = output_dir / 'token_comparison.png'
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
-    plt.close()
-    
-    return output_path
 
-def create_cost_savings_chart(results, output_dir):
-    """Create cost savings visualization"""
+def draw_cost_savings(ax, results):
+    """Draw cost savings visualization"""
     # Calculate daily, monthly, yearly savings
-    avg_trad_cost = sum(r['cost'] for r in results['traditional']) / len(results['traditional'])
-    avg_opt_cost = sum(r['cost'] for r in results['optimized']) / len(results['optimized'])
-    
-    searches_per_day = [100, 1000, 10000, 100000]
-    daily_savings = [(avg_trad_cost - avg_opt_cost) * s for s in searches_per_day]
-    monthly_savings = [d * 30 for d in daily_savings]
-    yearly_savings = [d * 365 for d in daily_savings]
+    avg_trad_cost = results['traditional']['cost'].mean()
+    avg_opt_cost = results['optimized']['cost'].mean()
     
-    # Create figure
-    fig, ax = plt.subplots(figsize=(12, 8))
+    searches_per_day = np.array([100, 1000, 10000, 100000])
+    # Rows: daily, monthly (30 days), yearly (365 days)
+    daily_savings, monthly_savings, yearly_savings = np.outer(
+        np.array([1, 30, 365]), searches_per_day * (avg_trad_cost - avg_opt_cost)
+    )
     
-    x = range(len(searches_per_day))
+    x = np.arange(len(searches_per_day))
     width = 0.25
     
     # Create bars
-    bars1 = ax.bar([i - width for i in x], daily_savings, width, 
+    bars1 = ax.bar(x - width, daily_savings, width, 
                     label='Daily', color='#3498db', alpha=0.8)
     bars2 = ax.bar(x, monthly_savings, width,
                     label='Monthly', color='#e74c3c', alpha=0.8)
-    bars3 = ax.bar([i + width for i in x], yearly_savings, width,
+    bars3 = ax.bar(x + width, yearly_savings, width,
                     label='Yearly', color='#2ecc71', alpha=0.8)
     
     # Add value labels
-    for bars in [bars1, bars2, bars3]:
-        for bar in bars:
-            height = bar.get_height()
-            if height > 1000:
-                label = f'${height/1000:.1f}K'
-            elif height > 1000000:
-                label = f'${height/1000000:.1f}M'
-            else:
-                label = f'${height:.0f}'
-            ax.text(bar.get_x() + bar.get_width()/2., height,
-                    label, ha='center', va='bottom', fontsize=10)
+    for bars, values in [(bars1, daily_savings), (bars2, monthly_savings), (bars3, yearly_savings)]:
+        ax.bar_label(bars, labels=[format_dollars(v) for v in values], fontsize=10)
     
     # Customize chart
     ax.set_xlabel('Searches per Day', fontsize=14)
     ax.set_ylabel('Cost Savings (USD)', fontsize=14)
-    ax.set_title('Projected Cost Savings with Optimized Search', fontsize=16, pad=20)
+    ax.set_title('Projected Cost Savings with Optimized Search', fontsize=14, pad=20)
     ax.set_xticks(x)
     ax.set_xticklabels([f'{s:,}' for s in searches_per_day])
     ax.legend(fontsize=12)
@@ -122,83 +145,62 @@ def create_cost_savings_chart(results, output_dir):
     
     # Set y-axis to log scale for better visualization
     ax.set_yscale('log')
-    
-    plt.tight_layout()
-    output_path = output_dir / 'cost_savings.png'
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
-    plt.close()
-    
-    return output_path
 
-def create_performance_chart(results, output_dir):
-    """Create performance improvement visualization"""
-    queries = []
-    improvements = []
-    
-    # Calculate improvements
-    for i, (trad, opt) in enumerate(zip(results['traditional'], results['optimized'])):
-        queries.append(f"Query {i+1}")
-        if trad['time'] > 0:
-            improvement = ((trad['time'] - opt['time']) / trad['time']) * 100
-            improvements.append(improvement)
-        else:
-            improvements.append(0)
-    
-    # Create figure
-    fig, ax = plt.subplots(figsize=(10, 6))
+def draw_performance(ax, results):
+    """Draw performance improvement visualization"""
+    # Calculate improvements (0 where the traditional time is 0)
+    trad_time = results['traditional']['time']
+    opt_time = results['optimized']['time']
+    safe_time = np.where(trad_time > 0, trad_time, 1)
+    improvements = np.where(trad_time > 0, (trad_time - opt_time) / safe_time * 100, 0)
+    queries = [f"Query {i+1}" for i in range(len(improvements))]
     
     # Create horizontal bar chart
     colors = ['#2ecc71' if imp > 90 else '#3498db' if imp > 80 else '#f39c12' for imp in improvements]
     bars = ax.barh(queries, improvements, color=colors, alpha=0.8)
     
     # Add value labels
-    for bar, imp in zip(bars, improvements):
-        ax.text(bar.get_width() + 1, bar.get_y() + bar.get_height()/2,
-                f'{imp:.1f}%', va='center', fontsize=10)
+    ax.bar_label(bars, fmt='{:.1f}%', padding=3, fontsize=10)
     
     # Customize chart
     ax.set_xlabel('Speed Improvement (%)', fontsize=14)
     ax.set_ylabel('Search Queries', fontsize=14)
-    ax.set_title('Performance Improvements with Optimized Search', fontsize=16, pad=20)
-    ax.set_xlim(0, max(improvements) * 1.1)
+    title = 'Performance Improvements with Optimized Search'
+    note = traditional_time_note(results)
+    if note:
+        title += f'\n({note})'
+    ax.set_title(title, fontsize=14, pad=20)
+    # Include negative improvements (optimized slower), or their bars and labels
+    # land far outside the axes
+    ax.set_xlim(min(improvements.min(), 0) * 1.1, max(improvements.max(), 0) * 1.1)
     ax.grid(axis='x', alpha=0.3)
     
     # Add average line
-    avg_improvement = sum(improvements) / len(improvements)
+    avg_improvement = improvements.mean()
     ax.axvline(avg_improvement, color='red', linestyle='--', linewidth=2, alpha=0.7)
     ax.text(avg_improvement + 2, len(queries) - 0.5, f'Avg: {avg_improvement:.1f}%', 
             fontsize=12, color='red', fontweight='bold')
-    
-    plt.tight_layout()
-    output_path = output_dir / 'performance_improvement.png'
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
-    plt.close()
-    
-    return output_path
 
-def create_summary_infographic(results, output_dir):
-    """Create a shareable infographic summarizing all results"""
+def draw_summary_infographic(ax, results):
+    """Draw a shareable infographic panel summarizing all results"""
     # Calculate summary stats
-    avg_trad_tokens = sum(r['tokens'] for r in results['traditional']) / len(results['traditional'])
-    avg_opt_tokens = sum(r['tokens'] for r in results['optimized']) / len(results['optimized'])
-    avg_trad_time = sum(r['time'] for r in results['traditional']) / len(results['traditional'])
-    avg_opt_time = sum(r['time'] for r in results['optimized']) / len(results['optimized'])
-    avg_trad_cost = sum(r['cost'] for r in results['traditional']) / len(results['traditional'])
-    avg_opt_cost = sum(r['cost'] for r in results['optimized']) / len(results['optimized'])
+    trad = results['traditional']
+    opt = results['optimized']
+    avg_trad_tokens, avg_opt_tokens = trad['tokens'].mean(), opt['tokens'].mean()
+    avg_trad_time, avg_opt_time = trad['time'].mean(), opt['time'].mean()
+    avg_trad_cost, avg_opt_cost = trad['cost'].mean(), opt['cost'].mean()
     
     token_reduction = ((avg_trad_tokens - avg_opt_tokens) / avg_trad_tokens) * 100
     time_improvement = ((avg_trad_time - avg_opt_time) / avg_trad_time) * 100
     cost_reduction = ((avg_trad_cost - avg_opt_cost) / avg_trad_cost) * 100
     
-    # Create figure
-    fig = plt.figure(figsize=(12, 8))
-    fig.patch.set_facecolor('#f8f9fa')
+    ax.set_facecolor('#f8f9fa')
     
     # Title
-    plt.text(0.5, 0.95, 'AI Code Search Optimization Results', 
-             fontsize=24, fontweight='bold', ha='center', transform=fig.transFigure)
-    plt.text(0.5, 0.90, 'Traditional Grep vs Optimized Indexed Search', 
-             fontsize=16, ha='center', transform=fig.transFigure, style='italic')
+    ax.text(0.5, 0.95, 'AI Code Search Optimization Results', 
+            fontsize=20, fontweight='bold', ha='center', transform=ax.transAxes)
+    ax.text(0.5, 0.88, 'Traditional Grep vs Optimized Indexed Search', 
+            fontsize=14, ha='center', transform=ax.transAxes, style='italic')
     
     # Create boxes for each metric
     metrics = [
@@ -210,7 +212,7 @@ def create_summary_infographic(results, output_dir):
             'color': '#3498db'
         },
         {
-            'title': 'Search Time',
+            'title': 'Search Time' + search_time_tag(results),
             'before': f'{avg_trad_time:.2f}s',
             'after': f'{avg_opt_time:.2f}s',
             'reduction': f'{time_improvement:.1f}%',
@@ -233,35 +235,46 @@ def create_summary_infographic(results, output_dir):
                                       boxstyle="round,pad=0.02",
                                       facecolor='white',
                                       edgecolor=metric['color'],
-                                      linewidth=2)
-        fig.patches.append(box)
+                                      linewidth=2,
+                                      transform=ax.transAxes)
+        ax.add_patch(box)
         
         # Add text
-        plt.text(0.15, y_pos + 0.03, metric['title'], fontsize=18, fontweight='bold',
-                transform=fig.transFigure)
-        plt.text(0.15, y_pos - 0.02, f"Before: {metric['before']}", fontsize=14,
-                transform=fig.transFigure)
-        plt.text(0.35, y_pos - 0.02, f"After: {metric['after']}", fontsize=14,
-                transform=fig.transFigure)
-        plt.text(0.75, y_pos, metric['reduction'], fontsize=20, fontweight='bold',
+        ax.text(0.15, y_pos + 0.03, metric['title'], fontsize=16, fontweight='bold',
+                transform=ax.transAxes)
+        ax.text(0.15, y_pos - 0.03, f"Before: {metric['before']}", fontsize=12,
+                transform=ax.transAxes)
+        ax.text(0.45, y_pos - 0.03, f"After: {metric['after']}", fontsize=12,
+                transform=ax.transAxes)
+        ax.text(0.75, y_pos, metric['reduction'], fontsize=18, fontweight='bold',
                 color=metric['color'], ha='center', va='center',
-                transform=fig.transFigure)
+                transform=ax.transAxes)
     
     # Add bottom text
-    plt.text(0.5, 0.1, 'Projected Annual Savings for 10M Searches/Day: $10.9M', 
-             fontsize=18, fontweight='bold', ha='center', transform=fig.transFigure,
-             bbox=dict(boxstyle='round', facecolor='yellow', alpha=0.7))
+    ax.text(0.5, 0.08, 'Projected Annual Savings for 10M Searches/Day: $10.9M', 
+            fontsize=14, fontweight='bold', ha='center', transform=ax.transAxes,
+            bbox=dict(boxstyle='round', facecolor='yellow', alpha=0.7))
     
-    plt.text(0.5, 0.03, f'Benchmark Date: {datetime.now().strftime("%Y-%m-%d")}', 
-             fontsize=10, ha='center', transform=fig.transFigure, alpha=0.7)
+    ax.text(0.5, 0.0, f'Benchmark Date: {datetime.now().strftime("%Y-%m-%d")}', 
+            fontsize=10, ha='center', transform=ax.transAxes, alpha=0.7)
     
     # Remove axes
-    plt.axis('off')
+    ax.axis('off')
+
+def create_all_charts(results, output_dir):
+    """Render every chart into a single 2x2 figure and save it as one PNG"""
+    fig, axes = plt.subplots(2, 2, figsize=(16, 12))
+    fig.patch.set_facecolor('#f8f9fa')
+    
+    draw_token_comparison(axes[0][0], results)
+    draw_cost_savings(axes[0][1], results)
+    draw_performance(axes[1][0], results)
+    draw_summary_infographic(axes[1][1], results)
     
-    plt.tight_layout()
-    output_path = output_dir / 'summary_infographic.png'
-    plt.savefig(output_path, dpi=300, bbox_inches='tight', facecolor='#f8f9fa')
-    plt.close()
+    fig.tight_layout()
+    output_path = output_dir / 'benchmark_summary.png'
+    fig.savefig(output_path, dpi=150, bbox_inches='tight', facecolor='#f8f9fa')
+    plt.close(fig)
     
     return output_path
 
@@ -286,11 +299,7 @@ def main():
     results = load_results(results_file)
     
     # Generate charts
-    charts = []
-    charts.append(create_token_comparison_chart(results, output_dir))
-    charts.append(create_cost_savings_chart(results, output_dir))
-    charts.append(create_performance_chart(results, output_dir))
-    charts.append(create_summary_infographic(results, output_dir))
+    charts = [create_all_charts(results, output_dir)]
     
     print("\n✅ Visualizations created:")
     for chart in charts: